@@ -11,21 +11,28 @@ Generates Steam app manifests, now with:
 import os
 import sys
 import re
-import requests
+import time
+import hashlib
+import json
+import tempfile
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import xml.etree.ElementTree as ET
 
 import gi
 gi.require_version("Gtk", "3.0")
-from gi.repository import Gtk, Gdk
+from gi.repository import Gtk, GLib
 
+# Filled with (app_id, app_name, app_name) using %-formatting, which is cheaper than str.format
 STEAM_MANIFEST_TEMPLATE = """\
 "AppState"
-{{
-    "AppID"        "{app_id}"
+{
+    "AppID"        "%s"
     "Universe"      "1"
-    "name"          "{app_name}"
+    "name"          "%s"
     "StateFlags"    "4"
-    "installdir"    "{app_name}"
+    "installdir"    "%s"
     "LastUpdated"   "0"
     "UpdateResult"  "0"
     "SizeOnDisk"    "0"
@@ -35,9 +42,52 @@ STEAM_MANIFEST_TEMPLATE = """\
     "BytesDownloaded"   "0"
     "BytesToStage"      "0"
     "BytesStaged"       "0"
-}}
+}
 """
 
+# Manifests are written as raw bytes, O_BINARY only exists (and matters) on Windows
+MANIFEST_OPEN_FLAGS = os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0)
+
+# Fetched profile XML is cached here, and reused until it is older than CACHE_TTL seconds
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "steam-appmanifest")
+CACHE_TTL = 24 * 60 * 60
+# ETag/Last-Modified of each cached profile, used to revalidate it once it expires
+VALIDATORS_PATH = os.path.join(CACHE_DIR, "etags.json")
+
+# Delay after the last keystroke in the search box before the list is refiltered
+SEARCH_DEBOUNCE_MS = 120
+
+class SteamProfileError(Exception):
+    """
+    Raised when Steam answers with well-formed XML that is not a games list, e.g. the
+    error document sent for a private or unknown profile.
+    """
+
+class ChunkReader:
+    """
+    Minimal binary file-like object over an iterator of byte chunks, so a streamed HTTP
+    body can be fed to ET.iterparse. Empty chunks are skipped, since an empty read means
+    end of file. Each chunk read is also written to copy_to, if given.
+    """
+    def __init__(self, chunks, copy_to=None):
+        self.chunks = iter(chunks)
+        self.copy_to = copy_to
+        self.copy_failed = False
+
+    def read(self, size=-1):
+        # iterparse accepts chunks of any length, so size is only a hint here
+        chunk = b""
+        for chunk in self.chunks:
+            if chunk:
+                break
+        if self.copy_to is not None and not self.copy_failed:
+            try:
+                self.copy_to.write(chunk)
+            except OSError:
+                # Keep parsing, the copy is only used for the cache
+                self.copy_failed = True
+        return chunk
+
 class SteamAppManifest(Gtk.Window):
     def __init__(self):
         super().__init__(title="Steam App Manifest")
@@ -45,13 +95,26 @@ class SteamAppManifest(Gtk.Window):
         self.set_resizable(True)
         self.set_default_size(600, 400)
 
-        # We'll store (toggled, app_id, name) in a ListStore for the TreeView
-        self.games_store = Gtk.ListStore(bool, str, str)
+        # Shared HTTP session, created on the first fetch, see get_http_session
+        self.http = None
+
+        # We'll store (toggled, app_id, name, visible) in a ListStore for the TreeView. The
+        # lowercased names used by the search are kept in self.names_lower, not in the store
+        self.games_store = Gtk.ListStore(bool, str, str, bool)
 
-        # Create a filter model from the main store
+        # Create a filter model from the main store. Visibility is read straight from column 3
+        # by GTK, so filtering makes no per-row Python calls
         self.search_text = ""
+        # Pending GLib timeout for a debounced refilter, see on_search_changed
+        self.refilter_source = None
         self.filtered_store = self.games_store.filter_new()
-        self.filtered_store.set_visible_func(self.game_filter)
+        self.filtered_store.set_visible_column(3)
+
+        # Search index, rebuilt on every refresh. Row indices in games_store, per character
+        # that appears in the lowercased name, and the set of rows currently visible
+        self.names_lower = []
+        self.char_index = {}
+        self.visible_rows = set()
 
         # Main Vertical Box
         main_vbox = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
@@ -63,12 +126,14 @@ class SteamAppManifest(Gtk.Window):
 
         row0_label = Gtk.Label(label="https://steamcommunity.com/id/")
         self.profile_entry = Gtk.Entry()
-        row0_btn_refresh = Gtk.Button(label="Refresh")
-        row0_btn_refresh.connect("clicked", self.on_refresh_click)
+        self.refresh_button = Gtk.Button(label="Refresh")
+        self.refresh_button.connect("clicked", self.on_refresh_click)
+        self.force_refetch_check = Gtk.CheckButton(label="Force refetch")
 
         row0_box.pack_start(row0_label, False, False, 0)
         row0_box.pack_start(self.profile_entry, True, True, 0)
-        row0_box.pack_start(row0_btn_refresh, False, False, 0)
+        row0_box.pack_start(self.force_refetch_check, False, False, 0)
+        row0_box.pack_start(self.refresh_button, False, False, 0)
 
         # Row1: Instruction label
         row1_label = Gtk.Label(label="Restart Steam for the changes to take effect.")
@@ -106,13 +171,23 @@ class SteamAppManifest(Gtk.Window):
         renderer_toggle.connect("toggled", self.on_toggle_toggled)
 
         col_toggle = Gtk.TreeViewColumn("Select", renderer_toggle, active=0)
+        col_toggle.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        col_toggle.set_fixed_width(60)
         self.treeview.append_column(col_toggle)
 
         # We'll hide the app_id in the UI, but store it in the model at column 1
         renderer_text = Gtk.CellRendererText()
+        renderer_text.set_fixed_height_from_font(1)
         col_name = Gtk.TreeViewColumn("Game Name", renderer_text, text=2)
+        col_name.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        col_name.set_fixed_width(400)
+        col_name.set_expand(True)
         self.treeview.append_column(col_name)
 
+        # Every row is one line of text, so let GTK assume a constant row height instead of
+        # measuring each row. This needs all columns to use fixed sizing
+        self.treeview.set_fixed_height_mode(True)
+
         scrolled_win.add(self.treeview)
 
         # Row5: Manual, Download, and Quit buttons
@@ -126,13 +201,13 @@ class SteamAppManifest(Gtk.Window):
         row5_download.connect("clicked", self.on_download_click)
 
         row5_quit = Gtk.Button(label="Quit")
-        row5_quit.connect("clicked", Gtk.main_quit)
+        row5_quit.connect("clicked", self.on_quit_click)
 
         row5_box.pack_start(row5_manual, False, False, 0)
         row5_box.pack_start(row5_download, False, False, 0)
         row5_box.pack_start(row5_quit, False, False, 0)
 
-        self.connect("destroy", Gtk.main_quit)
+        self.connect("destroy", self.on_destroy)
         self.show_all()
 
     def get_default_steam_path(self):
@@ -153,70 +228,326 @@ class SteamAppManifest(Gtk.Window):
     def on_refresh_click(self, button):
         """
         Called when the Refresh button is clicked.
-        Fetch the public Steam profile, parse for owned games, and populate the toggle list.
+        Fetch the public Steam profile in the background, then populate the toggle list.
         """
         profile_id = self.profile_entry.get_text().strip()
         if not profile_id:
             self.show_message("Please enter a profile ID.")
             return
 
+        # Disable Refresh until this fetch completes, so only one runs at a time
+        self.refresh_button.set_sensitive(False)
+        force_refetch = self.force_refetch_check.get_active()
+        # Refreshes run on a worker thread, so the network and parsing never block the UI.
+        # It is a daemon thread, so quitting never waits on a slow fetch
+        worker = threading.Thread(target=self.run_refresh, args=(profile_id, force_refetch),
+                                  daemon=True)
+        worker.start()
+
+    def run_refresh(self, profile_id, force_refetch):
+        """
+        Body of the refresh worker thread. Hands the (rows, error) result of
+        fetch_and_parse back to the GTK main loop.
+        """
+        try:
+            result = self.fetch_and_parse(profile_id, force_refetch)
+        except Exception as e:
+            result = None, f"Failed to refresh the profile: {e}"
+        GLib.idle_add(self.on_refresh_done, result)
+
+    def fetch_and_parse(self, profile_id, force_refetch):
+        """
+        Runs on the worker thread. Fetch (or load from cache) the profile XML and parse it.
+        Returns (rows, error), where error is a message for the user or None.
+        No GTK calls may be made from here.
+        """
+        # Use the cached copy of the profile if it is recent enough, unless a refetch is forced
+        cache_path = self.get_cache_path(profile_id)
+        if not force_refetch:
+            cache_file = self.open_cache(cache_path)
+            if cache_file is not None:
+                with cache_file:
+                    try:
+                        return self.parse_games(cache_file), None
+                    except (ET.ParseError, SteamProfileError):
+                        # A damaged cache file is simply refetched below
+                        pass
+
+        # Only imported once a fetch is actually needed, a cache hit never loads requests
+        import requests
+
+        # If an expired copy is on disk, ask Steam to only send the profile if it changed
+        headers = {}
+        if not force_refetch and os.path.exists(cache_path):
+            validators = self.load_validators().get(profile_id, {})
+            if "etag" in validators:
+                headers["If-None-Match"] = validators["etag"]
+            if "last_modified" in validators:
+                headers["If-Modified-Since"] = validators["last_modified"]
+
         url = f"https://steamcommunity.com/id/{profile_id}/games?tab=all&xml=1"
         try:
-            response = requests.get(url, timeout=10)
+            response = self.get_http_session().get(url, headers=headers, timeout=10, stream=True)
             response.raise_for_status()
         except requests.RequestException as e:
-            self.show_message(f"Failed to fetch the profile: {e}")
-            return
+            return None, f"Failed to fetch the profile: {e}"
+
+        if response.status_code == 304:
+            # Unchanged, so mark the cached copy fresh again and parse it
+            response.close()
+            try:
+                os.utime(cache_path)
+                with open(cache_path, 'rb') as cache_file:
+                    return self.parse_games(cache_file), None
+            except (OSError, ET.ParseError, SteamProfileError):
+                # The cached copy went missing or is damaged, fetch the full profile instead
+                return self.fetch_and_parse(profile_id, True)
+
+        # Feed the body to the parser as it arrives, copying it into the cache on the way,
+        # so the whole document is never held in memory
+        cache_file, tmp_path = self.open_cache_writer()
+        reader = ChunkReader(response.iter_content(chunk_size=16 * 1024), cache_file)
+        rows, error = None, None
+        try:
+            with response:
+                rows = self.parse_games(reader)
+        except ET.ParseError as e:
+            error = f"Failed to parse the XML: {e}"
+        except SteamProfileError as e:
+            error = str(e)
+        except requests.RequestException as e:
+            error = f"Failed to fetch the profile: {e}"
 
-        # Clear the store each time Refresh is clicked, so we do not accumulate duplicates
-        self.games_store.clear()
+        # Only cache games lists that parsed, so a bad fetch or an error document from Steam
+        # is never served from disk
+        if self.close_cache_writer(cache_file, tmp_path, cache_path,
+                                   keep=error is None and not reader.copy_failed):
+            self.save_validators(profile_id, response.headers)
+        return rows, error
 
+    def get_http_session(self):
+        """
+        Return the shared HTTP session, creating it on first use. requests is imported
+        here rather than at startup, since it is only needed once a profile is fetched.
+        """
+        if self.http is None:
+            import requests
+            # Reuse one HTTP session, so repeat refreshes skip the TCP and TLS handshakes
+            self.http = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=2, pool_maxsize=4)
+            self.http.mount("https://", adapter)
+        return self.http
+
+    def parse_games(self, source):
+        """
+        Parse the profile XML from a binary file-like source into
+        (toggled, app_id, name, lowercased name) rows. Raises ET.ParseError on bad XML, and
+        SteamProfileError if Steam sent an error instead of a games list.
+        """
+        # Stream-parse the XML, so only one <game> element is held in memory at a time.
+        # open_elements tracks the ancestors of the current element, so each consumed
+        # <game> can be detached from its <games> parent, not just emptied
+        rows = []
+        root_tag = None
+        open_elements = []
+        for event, game in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                if root_tag is None:
+                    root_tag = game.tag
+                open_elements.append(game)
+                continue
+            open_elements.pop()
+            if game.tag == "error":
+                raise SteamProfileError(f"Steam returned an error: {(game.text or '').strip()}")
+            if game.tag != "game":
+                continue
+            app_id = game.findtext("appID")
+            name = game.findtext("name")
+            if app_id and name:
+                # Each game starts with toggled=False by default, the lowercased
+                # name is computed once here rather than on every search keystroke.
+                # str.lower() already takes a fast path for ASCII-only names
+                rows.append([False, app_id, name, name.lower()])
+            open_elements[-1].remove(game)
+
+        if root_tag != "gamesList":
+            raise SteamProfileError("Steam did not return a games list, is the profile public?")
+        return rows
+
+    def on_refresh_done(self, result):
+        """
+        Called on the GTK main loop with the (rows, error) result of a refresh.
+        """
+        self.refresh_button.set_sensitive(True)
+        rows, error = result
+        if error:
+            self.show_message(error)
+        else:
+            self.populate_games(rows)
+        # Run once only
+        return False
+
+    def get_cache_path(self, profile_id):
+        """
+        Return the on-disk cache file used for the given profile ID.
+        """
+        digest = hashlib.sha1(profile_id.encode("utf-8")).hexdigest()
+        return os.path.join(CACHE_DIR, f"{digest}.xml")
+
+    def open_cache(self, cache_path):
+        """
+        Open the cached profile XML for reading, or return None if it is missing or older
+        than CACHE_TTL.
+        """
         try:
-            root = ET.fromstring(response.text)
-            games_xml = root.iter('game')
-        except ET.ParseError as e:
-            self.show_message(f"Failed to parse the XML: {e}")
+            if os.stat(cache_path).st_mtime < time.time() - CACHE_TTL:
+                return None
+            return open(cache_path, 'rb')
+        except OSError:
+            return None
+
+    def open_cache_writer(self):
+        """
+        Open a temporary file in CACHE_DIR for a profile being fetched.
+        Returns (file, tmp_path), or (None, None) if the cache is not writable, the cache is
+        only an optimisation.
+        """
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+        except OSError:
+            return None, None
+        return os.fdopen(fd, 'wb'), tmp_path
+
+    def close_cache_writer(self, cache_file, tmp_path, cache_path, keep):
+        """
+        Close a file from open_cache_writer, and either atomically move it into place at
+        cache_path or delete it. Returns True if cache_path was written, failures are ignored.
+        """
+        if cache_file is None:
+            return False
+        try:
+            cache_file.close()
+            if keep:
+                os.replace(tmp_path, cache_path)
+                return True
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        return False
+
+    def load_validators(self):
+        """
+        Return the saved {profile_id: {"etag": ..., "last_modified": ...}} mapping.
+        """
+        try:
+            with open(VALIDATORS_PATH, 'r', encoding='utf-8') as f:
+                validators = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return validators if isinstance(validators, dict) else {}
+
+    def save_validators(self, profile_id, response_headers):
+        """
+        Remember the ETag and Last-Modified headers sent with a freshly cached profile.
+        """
+        entry = {}
+        if "ETag" in response_headers:
+            entry["etag"] = response_headers["ETag"]
+        if "Last-Modified" in response_headers:
+            entry["last_modified"] = response_headers["Last-Modified"]
+
+        validators = self.load_validators()
+        if entry:
+            validators[profile_id] = entry
+        elif validators.pop(profile_id, None) is None:
+            # Nothing saved before and nothing to save now
             return
 
-        for game in games_xml:
-            app_id = game.find('appID').text if game.find('appID') is not None else None
-            name = game.find('name').text if game.find('name') is not None else None
-            if app_id and name:
-                # Add the game to the ListStore with toggled=False by default
-                self.games_store.append([False, app_id, name])
+        validators_file, tmp_path = self.open_cache_writer()
+        if validators_file is None:
+            return
+        try:
+            validators_file.write(json.dumps(validators).encode('utf-8'))
+            written = True
+        except OSError:
+            written = False
+        self.close_cache_writer(validators_file, tmp_path, VALIDATORS_PATH, keep=written)
 
-        # After refreshing, re-run the filter so the user sees the correct results
-        self.filtered_store.refilter()
+    def populate_games(self, rows):
+        """
+        Replace the contents of the games store with the given
+        (toggled, app_id, name, lowercased name) rows, the lowercased names going to the
+        search index rather than the store.
+        The TreeView is detached while loading, so it does not update once per inserted row.
+        """
+        self.names_lower = [row[3] for row in rows]
+        self.char_index = defaultdict(list)
+        for idx, name_lower in enumerate(self.names_lower):
+            for ch in set(name_lower):
+                self.char_index[ch].append(idx)
+        self.visible_rows = self.find_matches()
+
+        self.treeview.set_model(None)
+        # Clear the store each time Refresh is clicked, so we do not accumulate duplicates
+        self.games_store.clear()
+        for idx, row in enumerate(rows):
+            # Rows are inserted already marked visible or hidden for the current search
+            visible = idx in self.visible_rows
+            self.games_store.insert_with_valuesv(-1, [0, 1, 2, 3], row[:3] + [visible])
+
+        # After refreshing, re-attach so the user sees the correct results
+        self.treeview.set_model(self.filtered_store)
 
     def on_search_changed(self, entry):
         """
         Callback triggered when the user types in the search box.
-        Updates the search string and refilters the list.
+        Schedules a refilter, restarting the delay on every keystroke so a burst of
+        typing only walks the list once.
         """
-        self.search_text = entry.get_text().strip().lower()
-        self.filtered_store.refilter()
+        if self.refilter_source is not None:
+            GLib.source_remove(self.refilter_source)
+        self.refilter_source = GLib.timeout_add(SEARCH_DEBOUNCE_MS, self.do_refilter)
 
-    def game_filter(self, store, iter_, data=None):
+    def do_refilter(self):
+        """
+        Updates the search string from the search box and refilters the list.
         """
-        The visible_func for the filter. Shows rows where the game name matches the search text.
+        self.refilter_source = None
+        search_text = self.search_entry.get_text().strip().lower()
+        # Nothing to do if the effective search did not change (e.g. trailing spaces)
+        if search_text != self.search_text:
+            self.search_text = search_text
+            # Only write rows whose visibility actually changes, the filter model
+            # picks each change up from the row-changed signal
+            visible_rows = self.find_matches()
+            for idx in visible_rows ^ self.visible_rows:
+                self.games_store[idx][3] = idx in visible_rows
+            self.visible_rows = visible_rows
+        # Run once only
+        return False
+
+    def find_matches(self):
+        """
+        Return the set of row indices whose game name matches the search text.
         """
-        toggled, app_id, game_name = store[iter_]
         # If no search text, show everything
         if not self.search_text:
-            return True
-        # Otherwise, show if self.search_text is a substring of game_name (case-insensitive)
-        return self.search_text in game_name.lower()
+            return set(range(len(self.names_lower)))
+        # Otherwise, only rows containing every search character can match, so just check
+        # the smallest of those characters' buckets for the full substring
+        candidates = min((self.char_index.get(ch, ()) for ch in set(self.search_text)), key=len)
+        return {idx for idx in candidates if self.search_text in self.names_lower[idx]}
 
     def on_toggle_toggled(self, cell_renderer, path):
         """
         Toggle the checkbox in the TreeView (the underlying store is self.games_store).
         """
-        # Convert path in filtered_store to an iter in the filtered model
-        filtered_iter = self.filtered_store.get_iter(path)
-        # Map this to the underlying store's iter
-        real_iter = self.filtered_store.convert_iter_to_child_iter(filtered_iter)
-        current_state = self.games_store[real_iter][0]
-        self.games_store[real_iter][0] = not current_state
+        # Map the path in filtered_store straight to the underlying store's path
+        filtered_path = Gtk.TreePath.new_from_string(path)
+        child_path = self.filtered_store.convert_path_to_child_path(filtered_path)
+        row = self.games_store[child_path]
+        row[0] = not row[0]
 
     def on_manual_click(self, button):
         """
@@ -233,20 +564,54 @@ class SteamAppManifest(Gtk.Window):
             self.show_message("Please provide a valid Steam library path.")
             return
 
-        created_count = 0
+        jobs = []
         for row in self.games_store:
-            toggled, app_id, game_name = row
+            toggled, app_id, game_name, _ = row
             if toggled:
-                manifest_content = STEAM_MANIFEST_TEMPLATE.format(app_id=app_id, app_name=game_name)
+                manifest_content = STEAM_MANIFEST_TEMPLATE % (app_id, game_name, game_name)
                 manifest_path = os.path.join(steam_path, f"appmanifest_{app_id}.acf")
-                try:
-                    with open(manifest_path, 'w', encoding='utf-8') as f:
-                        f.write(manifest_content)
-                    created_count += 1
-                except OSError as e:
-                    self.show_message(f"Error creating manifest for {game_name}: {e}")
-
-        self.show_message(f"Successfully created {created_count} manifest files.")
+                jobs.append((game_name, manifest_path, manifest_content.encode('utf-8')))
+
+        # Each write is tiny, so overlap the open/write/close syscalls across a few threads
+        with ThreadPoolExecutor(max_workers=8) as write_executor:
+            errors = [e for e in write_executor.map(self.write_manifest, jobs) if e]
+
+        # Report all failures in one dialog, rather than one dialog per failed manifest
+        message = f"Successfully created {len(jobs) - len(errors)} manifest files."
+        if errors:
+            message += "\n\n" + "\n".join(errors)
+        self.show_message(message)
+
+    def write_manifest(self, job):
+        """
+        Write a single (game_name, manifest_path, payload) job, payload being the encoded
+        manifest. Returns an error message on failure, or None on success.
+        """
+        game_name, manifest_path, payload = job
+        try:
+            # A raw fd avoids setting up buffered and text wrappers for a single small write
+            fd = os.open(manifest_path, MANIFEST_OPEN_FLAGS, 0o644)
+            try:
+                while payload:
+                    payload = payload[os.write(fd, payload):]
+            finally:
+                os.close(fd)
+        except OSError as e:
+            return f"Error creating manifest for {game_name}: {e}"
+        return None
+
+    def on_quit_click(self, button):
+        """
+        Close the window straight away, which quits via on_destroy.
+        """
+        self.destroy()
+
+    def on_destroy(self, widget):
+        """
+        Quit the main loop. An in-flight refresh runs on a daemon thread, so it is simply
+        abandoned at exit rather than waited on.
+        """
+        Gtk.main_quit()
 
     def show_message(self, message):
         dialog = Gtk.MessageDialog(